@@ -106,26 +106,32 @@ Eerdere features (v11):
 # Fallback package installer voor Streamlit Cloud
 import subprocess
 import sys
+from importlib.util import find_spec
 
 def install_packages():
     packages = ['plotly', 'pandas', 'requests', 'folium', 'streamlit-folium', 'openpyxl', 'reportlab']
     for package in packages:
-        try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
+        # find_spec controleert alleen aanwezigheid, zonder de module te importeren
+        if find_spec(package.replace('-', '_')) is None:
             subprocess.check_call([sys.executable, '-m', 'pip', 'install', package, '-q'])
 
 install_packages()
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import requests
+from urllib3.util.retry import Retry
 import json
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from functools import lru_cache
 import base64
+import hashlib
 import re
 
 # =============================================================================
@@ -143,6 +149,29 @@ st.set_page_config(
 ODOO_URL = "https://lab.odoo.works/jsonrpc"
 ODOO_DB = "lab.odoo.works"
 ODOO_UID = 37
+# Maximaal aantal gelijktijdige Odoo requests bij onafhankelijke queries
+ODOO_MAX_PARALLEL_CALLS = 6
+
+# Gedeelde HTTP sessie: keep-alive + connection pool, zodat de TLS handshake
+# niet per Odoo call opnieuw gebeurt
+# Verbindingsfouten en 502/503/504 worden met backoff herhaald (JSON-RPC leesacties
+# zijn idempotent); read timeouts niet, die wachten al `timeout` seconden.
+ODOO_SESSION = requests.Session()
+ODOO_SESSION.mount("https://", requests.adapters.HTTPAdapter(
+    pool_connections=4, pool_maxsize=ODOO_MAX_PARALLEL_CALLS * 2,
+    max_retries=Retry(
+        total=2, connect=2, read=0, status=2,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    ),
+))
+
+# Circuit breaker: na herhaalde verbindings-, 5xx- of decodeerfouten Odoo even niet meer aanroepen
+ODOO_CIRCUIT_FAILURE_THRESHOLD = 3
+ODOO_CIRCUIT_OPEN_SECONDS = 30
+_odoo_circuit = {"failures": 0, "open_until": 0.0}
 
 # API Key - probeer secrets, anders gebruik session state (input in main)
 def get_api_key():
@@ -359,6 +388,16 @@ ACCOUNT_TRANSLATIONS = {
     "Current account": "Rekening-courant"
 }
 
+# Lowercase sleutels eenmalig voorberekenen voor de gedeeltelijke match
+_ACCOUNT_TRANSLATIONS_LOWER = tuple(
+    (eng.lower(), eng, nl) for eng, nl in ACCOUNT_TRANSLATIONS.items()
+)
+# Eén scan over de naam om te bepalen of er überhaupt een sleutel in voorkomt
+_ACCOUNT_TRANSLATIONS_PATTERN = re.compile(
+    "|".join(re.escape(eng_lower) for eng_lower, _, _ in _ACCOUNT_TRANSLATIONS_LOWER)
+)
+
+@lru_cache(maxsize=4096)
 def translate_account_name(name):
     """Vertaal Engelse rekeningnaam naar Nederlands indien beschikbaar"""
     if not name:
@@ -367,8 +406,11 @@ def translate_account_name(name):
     if name in ACCOUNT_TRANSLATIONS:
         return ACCOUNT_TRANSLATIONS[name]
     # Dan gedeeltelijke match
-    for eng, nl in ACCOUNT_TRANSLATIONS.items():
-        if eng.lower() in name.lower():
+    name_lower = name.lower()
+    if not _ACCOUNT_TRANSLATIONS_PATTERN.search(name_lower):
+        return name
+    for eng_lower, eng, nl in _ACCOUNT_TRANSLATIONS_LOWER:
+        if eng_lower in name_lower:
             return name.replace(eng, nl)
     return name
 
@@ -383,48 +425,118 @@ def get_category_name(account_code):
 # ODOO API HELPERS
 # =============================================================================
 
+# Vaste context dicts (worden alleen geserialiseerd, nooit gewijzigd)
+_ODOO_CONTEXT = {"lang": "nl_NL"}
+_ODOO_CONTEXT_ARCHIVED = {"lang": "nl_NL", "active_test": False}
+
+def _execute_kw_payload(args):
+    """JSON-RPC envelope rond execute_kw argumenten"""
+    return {
+        "jsonrpc": "2.0",
+        "method": "call",
+        "params": {"service": "object", "method": "execute_kw", "args": args},
+        "id": 1
+    }
+
+def _odoo_call_payload(api_key, model, method, domain, fields, limit=None, include_archived=False):
+    """Bouw de JSON-RPC payload voor een execute_kw call"""
+    # Always use Dutch language, optionally include archived records
+    kwargs = {"fields": fields, "context": _ODOO_CONTEXT_ARCHIVED if include_archived else _ODOO_CONTEXT}
+    if limit:
+        kwargs["limit"] = limit
+    return _execute_kw_payload([ODOO_DB, ODOO_UID, api_key, model, method, [domain], kwargs])
+
+class OdooUnavailableError(requests.exceptions.ConnectionError):
+    """Circuit breaker staat open: Odoo wordt tijdelijk niet aangeroepen"""
+
+def _odoo_post(payload, timeout=120):
+    """POST een JSON-RPC payload via de gedeelde sessie, met circuit breaker"""
+    if time.time() < _odoo_circuit["open_until"]:
+        raise OdooUnavailableError("Odoo tijdelijk niet bereikbaar, probeer het over enkele seconden opnieuw")
+    try:
+        response = ODOO_SESSION.post(ODOO_URL, json=payload, timeout=timeout)
+        # Na uitgeputte retries komen 5xx responses gewoon door: ook als fout tellen
+        if response.status_code >= 500:
+            response.raise_for_status()
+        result = response.json()
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+            requests.exceptions.HTTPError, ValueError):
+        _odoo_circuit["failures"] += 1
+        if _odoo_circuit["failures"] >= ODOO_CIRCUIT_FAILURE_THRESHOLD:
+            _odoo_circuit["open_until"] = time.time() + ODOO_CIRCUIT_OPEN_SECONDS
+        raise
+    _odoo_circuit["failures"] = 0
+    return result
+
 def odoo_call(model, method, domain, fields, limit=None, timeout=120, include_archived=False):
     """Generieke Odoo JSON-RPC call met verbeterde timeout handling"""
     api_key = get_api_key()
     if not api_key:
         return []
     
-    args = [ODOO_DB, ODOO_UID, api_key, model, method, [domain]]
-    kwargs = {"fields": fields}
-    if limit:
-        kwargs["limit"] = limit
-    # Always use Dutch language, optionally include archived records
-    context = {"lang": "nl_NL"}
-    if include_archived:
-        context["active_test"] = False
-    kwargs["context"] = context
-    args.append(kwargs)
-    
-    payload = {
-        "jsonrpc": "2.0",
-        "method": "call",
-        "params": {
-            "service": "object",
-            "method": "execute_kw",
-            "args": args
-        },
-        "id": 1
-    }
+    payload = _odoo_call_payload(api_key, model, method, domain, fields, limit, include_archived)
     
-    try:
-        response = requests.post(ODOO_URL, json=payload, timeout=timeout)
-        result = response.json()
-        if "error" in result:
-            st.error(f"Odoo error: {result['error']}")
-            return []
-        return result.get("result", [])
-    except requests.exceptions.Timeout:
-        st.error("⏱️ Timeout - probeer een kortere periode of specifieke entiteit")
+    # Transportfouten (timeout, verbinding, circuit breaker) niet afvangen: anders
+    # onthoudt st.cache_data een lege lijst. main() toont de melding.
+    result = _odoo_post(payload, timeout=timeout)
+    if "error" in result:
+        st.error(f"Odoo error: {result['error']}")
         return []
-    except Exception as e:
-        st.error(f"Connection error: {e}")
+    return result.get("result", [])
+
+def odoo_error_message(error):
+    """Gebruikersmelding voor een mislukte Odoo request"""
+    if isinstance(error, requests.exceptions.Timeout):
+        return "⏱️ Timeout - probeer een kortere periode of specifieke entiteit"
+    if isinstance(error, OdooUnavailableError):
+        return f"⚠️ {error}"
+    return f"Connection error: {error}"
+
+def _odoo_post_many(payloads, timeout=120):
+    """Post meerdere onafhankelijke payloads parallel (I/O-bound, dus threads).
+
+    Geeft per payload de gedecodeerde JSON response of de opgetreden exception
+    terug, in dezelfde volgorde. Foutmeldingen worden door de aanroeper in de
+    hoofdthread getoond (st.* werkt niet vanuit worker threads).
+    """
+    if not payloads:
         return []
 
+    def _post(payload):
+        try:
+            return _odoo_post(payload, timeout=timeout)
+        except Exception as e:
+            return e
+
+    workers = min(ODOO_MAX_PARALLEL_CALLS, len(payloads))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_post, payloads))
+
+def odoo_call_many(calls, timeout=120):
+    """Voer meerdere odoo_call's parallel uit.
+
+    calls: lijst van dicts met de keyword-argumenten van odoo_call
+    (model, method, domain, fields, limit, include_archived).
+    """
+    api_key = get_api_key()
+    if not api_key:
+        return [[] for _ in calls]
+
+    payloads = [_odoo_call_payload(api_key, **call) for call in calls]
+    responses = _odoo_post_many(payloads, timeout=timeout)
+    # Net als odoo_call: transportfouten doorgeven i.p.v. lege lijsten te laten cachen
+    for response in responses:
+        if isinstance(response, Exception):
+            raise response
+    results = []
+    for response in responses:
+        if "error" in response:
+            st.error(f"Odoo error: {response['error']}")
+            results.append([])
+        else:
+            results.append(response.get("result", []))
+    return results
+
 # =============================================================================
 # OPENAI CHATBOT HELPERS
 # =============================================================================
@@ -614,134 +726,200 @@ def process_chat_message(user_message, chat_history, context_info):
     
     return response, None
 
+
+def _clear_chat():
+    """Callback: wis de chatgeschiedenis."""
+    st.session_state.chat_messages = []
+
+
+def _toggle_chat_examples():
+    """Callback: toon/verberg de voorbeeldvragen."""
+    st.session_state.show_examples = not st.session_state.get("show_examples", False)
+
+
+def _queue_chat_example(question):
+    """Callback: zet een voorbeeldvraag in de chatgeschiedenis."""
+    st.session_state.chat_messages.append({"role": "user", "content": question})
+
 # =============================================================================
 # DATA FUNCTIES
 # =============================================================================
 
-@st.cache_data(ttl=300)
-def get_bank_balances():
-    """Haal alle banksaldi op per rekening (excl. R/C intercompany)"""
-    journals = odoo_call(
-        "account.journal", "search_read",
-        [["type", "=", "bank"]],
-        ["name", "company_id", "default_account_id", "current_statement_balance", "code"]
-    )
-    
-    # Haal account codes op voor de journals om R/C te kunnen filteren
-    account_ids = [j.get("default_account_id", [None])[0] for j in journals if j.get("default_account_id")]
-    accounts = {}
-    if account_ids:
+# R/C rekeningcodes: 12* vorderingen op / 14* schulden aan groepsmaatschappijen
+RC_ACCOUNT_PREFIXES = ("12", "14")
+RC_NAME_MARKERS = ("R/C", "RC ")
+
+def _is_rc_journal(name, account_code):
+    """R/C detectie: naam bevat R/C OF rekeningcode begint met 12 of 14"""
+    return account_code.startswith(RC_ACCOUNT_PREFIXES) or any(m in name for m in RC_NAME_MARKERS)
+
+# Rekeningcodes wijzigen zelden: id -> (code, opgehaald_op) over st.cache_data TTL's heen bewaren
+# (de Ververs-knop leegt deze cache wel)
+ACCOUNT_CODE_CACHE_SECONDS = 3600
+_account_code_cache = {}
+
+def _get_account_codes(account_ids):
+    """Rekeningcodes per account id; alleen onbekende of verlopen ids worden opgehaald.
+
+    search_read ondersteunt geen gestippelde velden (default_account_id.code),
+    dus de codes komen uit een aparte account.account call.
+    """
+    now = time.time()
+    missing = [
+        aid for aid in set(account_ids)
+        if now - _account_code_cache.get(aid, (None, 0.0))[1] >= ACCOUNT_CODE_CACHE_SECONDS
+    ]
+    if missing:
         account_data = odoo_call(
             "account.account", "search_read",
-            [["id", "in", account_ids]],
-            ["id", "code", "name"]
+            [["id", "in", missing]],
+            ["id", "code"]
         )
-        accounts = {a["id"]: a for a in account_data}
-    
-    # Filter: echte bankrekeningen vs R/C intercompany
-    bank_only = []
-    for j in journals:
-        name = j.get("name", "")
-        account_id = j.get("default_account_id", [None])[0]
-        account_code = accounts.get(account_id, {}).get("code", "") if account_id else ""
-        
-        # R/C detectie: naam bevat R/C OF rekeningcode begint met 12 of 14
-        is_rc = (
-            "R/C" in name or 
-            "RC " in name or
-            str(account_code).startswith("12") or  # Vorderingen op groepsmaatschappijen
-            str(account_code).startswith("14")     # Schulden aan groepsmaatschappijen
-        )
-        
-        if not is_rc:
-            bank_only.append(j)
-    
-    return bank_only
+        for a in account_data:
+            _account_code_cache[a["id"]] = (a.get("code", ""), now)
+    return {aid: _account_code_cache[aid][0] for aid in account_ids if aid in _account_code_cache}
 
 @st.cache_data(ttl=300)
-def get_rc_balances():
-    """Haal R/C (Rekening Courant) intercompany saldi op"""
+def _get_bank_journals_classified():
+    """Haal bankjournalen één keer op en splits in echte bankrekeningen en R/C.
+
+    Returns dict: {"bank": [...], "rc": [...]}
+    """
     journals = odoo_call(
         "account.journal", "search_read",
         [["type", "=", "bank"]],
         ["name", "company_id", "default_account_id", "current_statement_balance", "code"]
     )
     
-    # Haal account codes op voor de journals
+    # Account codes voor de journals (om R/C te kunnen filteren)
     account_ids = [j.get("default_account_id", [None])[0] for j in journals if j.get("default_account_id")]
-    accounts = {}
-    if account_ids:
-        account_data = odoo_call(
-            "account.account", "search_read",
-            [["id", "in", account_ids]],
-            ["id", "code", "name"]
-        )
-        accounts = {a["id"]: a for a in account_data}
+    account_codes = _get_account_codes(account_ids)
     
-    # Filter: alleen R/C rekeningen
+    # Filter: echte bankrekeningen vs R/C intercompany
+    bank_only = []
     rc_only = []
     for j in journals:
-        name = j.get("name", "")
         account_id = j.get("default_account_id", [None])[0]
-        account_code = accounts.get(account_id, {}).get("code", "") if account_id else ""
+        account_code = str(account_codes.get(account_id, "") if account_id else "")
         
-        # R/C detectie
-        is_rc = (
-            "R/C" in name or 
-            "RC " in name or
-            str(account_code).startswith("12") or
-            str(account_code).startswith("14")
-        )
-        
-        if is_rc:
+        if _is_rc_journal(j.get("name", ""), account_code):
             # Voeg account code toe aan journal voor weergave
-            j["account_code"] = account_code
-            j["account_type"] = "Vordering" if str(account_code).startswith("12") else "Schuld"
-            rc_only.append(j)
+            rc_only.append({
+                **j,
+                "account_code": account_code,
+                "account_type": "Vordering" if account_code.startswith("12") else "Schuld",
+            })
+        else:
+            bank_only.append(j)
     
-    return rc_only
+    return {"bank": bank_only, "rc": rc_only}
+
+def get_bank_balances():
+    """Haal alle banksaldi op per rekening (excl. R/C intercompany)"""
+    return _get_bank_journals_classified()["bank"]
+
+def get_rc_balances():
+    """Haal R/C (Rekening Courant) intercompany saldi op"""
+    return _get_bank_journals_classified()["rc"]
 
 # Intercompany partner IDs (LAB Conceptstore, LAB Shops, LAB Projects)
 # Verplaatst naar boven voor gebruik in aggregatie functies
 INTERCOMPANY_PARTNERS = [1, 7, 8]
+INTERCOMPANY_PARTNER_SET = frozenset(INTERCOMPANY_PARTNERS)  # voor membership checks per regel
+# Gedeelde domeinfragmenten voor IC filtering
+IC_PARTNER_DOMAIN = ("partner_id", "in", INTERCOMPANY_PARTNERS)
+NON_IC_PARTNER_DOMAIN = ("partner_id", "not in", INTERCOMPANY_PARTNERS)
+
+def _read_group_payload(api_key, model, domain, fields, groupby, orderby=None, limit=None):
+    """Bouw de JSON-RPC payload voor een read_group call"""
+    kwargs = {
+        "fields": fields, 
+        "groupby": groupby, 
+        "lazy": False,
+        "context": _ODOO_CONTEXT_ARCHIVED  # Inclusief gearchiveerde records + Nederlandse taal
+    }
+    if orderby:
+        kwargs["orderby"] = orderby
+    if limit:
+        kwargs["limit"] = limit
+    return _execute_kw_payload([ODOO_DB, ODOO_UID, api_key, model, "read_group", [domain], kwargs])
 
-def odoo_read_group(model, domain, fields, groupby, timeout=120):
+def _read_group_disk_ttl(domain):
+    """Disk-cache TTL (seconden) voor een read_group domein; 0 = niet op disk cachen.
+
+    Kijkt naar de bovengrens van de datumfilters: afgesloten jaren krijgen
+    READ_GROUP_CACHE_TTL_CLOSED_YEAR, afgesloten maanden van dit jaar
+    READ_GROUP_CACHE_TTL_CLOSED_MONTH. Lopende periodes gaan alleen via st.cache_data.
+    """
+    end_dates = [
+        str(term[2])[:10] for term in domain
+        if isinstance(term, (list, tuple)) and len(term) == 3
+        and term[1] in ("<=", "<") and str(term[0]).endswith("date")
+    ]
+    if not end_dates:
+        return 0
+    try:
+        end_date = datetime.strptime(min(end_dates), "%Y-%m-%d").date()
+    except ValueError:
+        return 0
+    today = datetime.now().date()
+    if end_date.year < today.year:
+        return READ_GROUP_CACHE_TTL_CLOSED_YEAR
+    if end_date < today.replace(day=1):
+        return READ_GROUP_CACHE_TTL_CLOSED_MONTH
+    return 0
+
+def _read_group_cache_path(model, domain, fields, groupby, orderby=None, limit=None):
+    """Bestandspad voor de disk-cache van één read_group query"""
+    cache_key = hashlib.sha1(json.dumps(
+        [ODOO_DB, model, domain, fields, groupby, orderby, limit], default=str
+    ).encode("utf-8")).hexdigest()
+    return os.path.join(READ_GROUP_CACHE_DIR, f"{cache_key}.json")
+
+def clear_read_group_disk_cache():
+    """Verwijder alle read_group resultaten uit de disk-cache"""
+    import shutil
+    shutil.rmtree(READ_GROUP_CACHE_DIR, ignore_errors=True)
+
+def odoo_read_group(model, domain, fields, groupby, timeout=120, orderby=None, limit=None):
     """Odoo read_group voor server-side aggregatie - GEEN limiet!
     
     Inclusief gearchiveerde records (active_test: False) zodat transacties
-    met gearchiveerde contacten ook meekomen.
+    met gearchiveerde contacten ook meekomen. Met orderby/limit sorteert en
+    begrenst Odoo de groepen zelf (bijv. top-N).
     """
     api_key = get_api_key()
     if not api_key:
         return []
     
-    payload = {
-        "jsonrpc": "2.0",
-        "method": "call",
-        "params": {
-            "service": "object",
-            "method": "execute_kw",
-            "args": [ODOO_DB, ODOO_UID, api_key, model, "read_group", 
-                    [domain], {
-                        "fields": fields, 
-                        "groupby": groupby, 
-                        "lazy": False,
-                        "context": {"active_test": False, "lang": "nl_NL"}  # Inclusief gearchiveerde records + Nederlandse taal
-                    }]
-        },
-        "id": 1
-    }
+    # Afgesloten periodes veranderen niet meer: eerst de disk-cache proberen
+    disk_ttl = _read_group_disk_ttl(domain)
+    cache_path = _read_group_cache_path(model, domain, fields, groupby, orderby, limit) if disk_ttl else None
+    if cache_path:
+        try:
+            if datetime.now().timestamp() - os.path.getmtime(cache_path) < disk_ttl:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
     
-    try:
-        response = requests.post(ODOO_URL, json=payload, timeout=timeout)
-        result = response.json()
-        if "error" in result:
-            st.error(f"Odoo read_group error: {result['error']}")
-            return []
-        return result.get("result", [])
-    except Exception as e:
-        st.error(f"Read group error: {e}")
+    payload = _read_group_payload(api_key, model, domain, fields, groupby, orderby, limit)
+    
+    # Transportfouten doorgeven (zie odoo_call): geen lege lijst in st.cache_data
+    result = _odoo_post(payload, timeout=timeout)
+    if "error" in result:
+        st.error(f"Odoo read_group error: {result['error']}")
         return []
+    rows = result.get("result", [])
+    
+    if cache_path:
+        try:
+            os.makedirs(READ_GROUP_CACHE_DIR, exist_ok=True)
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump(rows, f)
+        except Exception as e:
+            print(f"Error writing read_group cache: {e}")
+    return rows
 
 @st.cache_data(ttl=3600)  # 1 uur cache
 def get_revenue_aggregated(year, company_id=None):
@@ -760,55 +938,28 @@ def get_revenue_aggregated(year, company_id=None):
     result = odoo_read_group("account.move.line", domain, ["balance:sum"], ["date:month"])
     return result
 
+# 4*, 6* en 7* kostenrekeningen als één OR-domein (prefix-notatie), zodat
+# Odoo alle kosten in één read_group scan per maand kan optellen
+COST_ACCOUNT_DOMAIN = [
+    "|", "|",
+    "&", ("account_id.code", ">=", "400000"), ("account_id.code", "<", "500000"),
+    "&", ("account_id.code", ">=", "600000"), ("account_id.code", "<", "700000"),
+    "&", ("account_id.code", ">=", "700000"), ("account_id.code", "<", "800000"),
+]
+
 @st.cache_data(ttl=3600)  # 1 uur cache
 def get_cost_aggregated(year, company_id=None):
-    """Server-side geaggregeerde kostendata - geen limiet!"""
-    # Query voor 4* rekeningen
-    domain_4 = [
-        ("account_id.code", ">=", "400000"),
-        ("account_id.code", "<", "500000"),
-        ("date", ">=", f"{year}-01-01"),
-        ("date", "<=", f"{year}-12-31"),
-        ("parent_state", "=", "posted")
-    ]
-    if company_id:
-        domain_4.append(("company_id", "=", company_id))
-    
-    # Query voor 6* rekeningen
-    domain_6 = [
-        ("account_id.code", ">=", "600000"),
-        ("account_id.code", "<", "700000"),
-        ("date", ">=", f"{year}-01-01"),
-        ("date", "<=", f"{year}-12-31"),
-        ("parent_state", "=", "posted")
-    ]
-    if company_id:
-        domain_6.append(("company_id", "=", company_id))
-    
-    # Query voor 7* rekeningen (kostprijs verkopen)
-    domain_7 = [
-        ("account_id.code", ">=", "700000"),
-        ("account_id.code", "<", "800000"),
+    """Server-side geaggregeerde kostendata (4*, 6* en 7*) - geen limiet!"""
+    domain = COST_ACCOUNT_DOMAIN + [
         ("date", ">=", f"{year}-01-01"),
         ("date", "<=", f"{year}-12-31"),
         ("parent_state", "=", "posted")
     ]
     if company_id:
-        domain_7.append(("company_id", "=", company_id))
-    
-    result_4 = odoo_read_group("account.move.line", domain_4, ["balance:sum"], ["date:month"])
-    result_6 = odoo_read_group("account.move.line", domain_6, ["balance:sum"], ["date:month"])
-    result_7 = odoo_read_group("account.move.line", domain_7, ["balance:sum"], ["date:month"])
-    
-    # Combineer resultaten per maand
-    monthly = {}
-    for r in result_4 + result_6 + result_7:
-        month = r.get("date:month", "Unknown")
-        if month not in monthly:
-            monthly[month] = 0
-        monthly[month] += r.get("balance", 0)
+        domain.append(("company_id", "=", company_id))
     
-    return [{"date:month": k, "balance": v} for k, v in monthly.items()]
+    result = odoo_read_group("account.move.line", domain, ["balance:sum"], ["date:month"])
+    return [{"date:month": r.get("date:month", "Unknown"), "balance": r.get("balance", 0)} for r in result]
 
 @st.cache_data(ttl=3600)
 def get_2026_actuals_by_category(company_id=None):
@@ -856,7 +1007,7 @@ def get_intercompany_revenue(year, company_id=None):
         ("date", ">=", f"{year}-01-01"),
         ("date", "<=", f"{year}-12-31"),
         ("parent_state", "=", "posted"),
-        ("partner_id", "in", INTERCOMPANY_PARTNERS)
+        IC_PARTNER_DOMAIN
     ]
     if company_id:
         domain.append(("company_id", "=", company_id))
@@ -866,55 +1017,63 @@ def get_intercompany_revenue(year, company_id=None):
 
 @st.cache_data(ttl=3600)
 def get_intercompany_costs(year, company_id=None):
-    """Haal alleen intercompany kosten op voor IC filtering"""
-    # 4* rekeningen
-    domain_4 = [
-        ("account_id.code", ">=", "400000"),
-        ("account_id.code", "<", "500000"),
-        ("date", ">=", f"{year}-01-01"),
-        ("date", "<=", f"{year}-12-31"),
-        ("parent_state", "=", "posted"),
-        ("partner_id", "in", INTERCOMPANY_PARTNERS)
-    ]
-    if company_id:
-        domain_4.append(("company_id", "=", company_id))
-    
-    # 6* rekeningen
-    domain_6 = [
-        ("account_id.code", ">=", "600000"),
-        ("account_id.code", "<", "700000"),
+    """Haal alleen intercompany kosten op voor IC filtering (4*, 6* en 7*)"""
+    domain = COST_ACCOUNT_DOMAIN + [
         ("date", ">=", f"{year}-01-01"),
         ("date", "<=", f"{year}-12-31"),
         ("parent_state", "=", "posted"),
-        ("partner_id", "in", INTERCOMPANY_PARTNERS)
+        IC_PARTNER_DOMAIN
     ]
     if company_id:
-        domain_6.append(("company_id", "=", company_id))
-    
-    # 7* rekeningen
-    domain_7 = [
-        ("account_id.code", ">=", "700000"),
-        ("account_id.code", "<", "800000"),
-        ("date", ">=", f"{year}-01-01"),
-        ("date", "<=", f"{year}-12-31"),
-        ("parent_state", "=", "posted"),
-        ("partner_id", "in", INTERCOMPANY_PARTNERS)
-    ]
-    if company_id:
-        domain_7.append(("company_id", "=", company_id))
-    
-    result_4 = odoo_read_group("account.move.line", domain_4, ["balance:sum"], ["date:month"])
-    result_6 = odoo_read_group("account.move.line", domain_6, ["balance:sum"], ["date:month"])
-    result_7 = odoo_read_group("account.move.line", domain_7, ["balance:sum"], ["date:month"])
-    
-    monthly = {}
-    for r in result_4 + result_6 + result_7:
-        month = r.get("date:month", "Unknown")
-        if month not in monthly:
-            monthly[month] = 0
-        monthly[month] += r.get("balance", 0)
+        domain.append(("company_id", "=", company_id))
     
-    return [{"date:month": k, "balance": v} for k, v in monthly.items()]
+    result = odoo_read_group("account.move.line", domain, ["balance:sum"], ["date:month"])
+    return [{"date:month": r.get("date:month", "Unknown"), "balance": r.get("balance", 0)} for r in result]
+
+# Volledige maandnaam (Odoo date:month labels) -> maandnummer
+_MONTH_LABEL_NUMBERS = {
+    'January': '01', 'February': '02', 'March': '03', 'April': '04',
+    'May': '05', 'June': '06', 'July': '07', 'August': '08',
+    'September': '09', 'October': '10', 'November': '11', 'December': '12',
+    # Nederlandse maanden
+    'januari': '01', 'februari': '02', 'maart': '03', 'april': '04',
+    'mei': '05', 'juni': '06', 'juli': '07', 'augustus': '08',
+    'september': '09', 'oktober': '10', 'november': '11', 'december': '12'
+}
+
+def parse_month_key(month_str):
+    """Converteer 'January 2025' naar '2025-01' voor sortering"""
+    try:
+        parts = month_str.split()
+        if len(parts) == 2:
+            month_name, year = parts
+            return f"{year}-{_MONTH_LABEL_NUMBERS.get(month_name, '00')}"
+        return month_str
+    except AttributeError:
+        return month_str
+
+def monthly_balance_by_key(rows):
+    """Som van balance per sorteerbare maand ('2025-01') voor date:month read_group rijen"""
+    if not rows:
+        return pd.Series(dtype=float)
+    df = pd.DataFrame(rows, columns=["date:month", "balance"])
+    labels = df["date:month"].fillna("Unknown")
+    # Elk uniek label maar één keer parsen
+    keys = labels.map({label: parse_month_key(label) for label in labels.unique()})
+    return df["balance"].fillna(0).groupby(keys).sum()
+
+# Maandafkorting (lowercase, 3 letters) -> maandnummer voor Odoo date:day labels,
+# locale-onafhankelijk (geen strptime %b)
+_DAY_LABEL_MONTHS = {
+    'jan': '01', 'feb': '02', 'mrt': '03', 'apr': '04',
+    'mei': '05', 'jun': '06', 'jul': '07', 'aug': '08',
+    'sep': '09', 'okt': '10', 'nov': '11', 'dec': '12',
+    # Engels als fallback
+    'mar': '03', 'may': '05', 'oct': '10'
+}
+
+# Odoo date:week labels: "W01 2025" of "Week 01 2025"
+_WEEK_LABEL_RE = re.compile(r'W?(?:eek\s*)?(\d+)\s+(\d{4})', re.IGNORECASE)
 
 @st.cache_data(ttl=3600)
 def get_weekly_revenue(year, company_id=None, exclude_intercompany=False):
@@ -929,37 +1088,35 @@ def get_weekly_revenue(year, company_id=None, exclude_intercompany=False):
     if company_id:
         domain.append(("company_id", "=", company_id))
     if exclude_intercompany and INTERCOMPANY_PARTNERS:
-        domain.append(("partner_id", "not in", INTERCOMPANY_PARTNERS))
+        domain.append(NON_IC_PARTNER_DOMAIN)
+    # Nulregels dragen niets bij aan de som: server-side overslaan
+    domain.append(("balance", "!=", 0))
     
     # Groepeer op week (date:week geeft ISO weeknummer)
     result = odoo_read_group("account.move.line", domain, ["balance:sum"], ["date:week"])
     
     # Converteer naar lijst met weeknummer en omzet (omzet is negatief in Odoo)
     weekly_data = []
-    import re
-    from datetime import datetime
     for r in result:
         week_str = r.get("date:week", "")
         balance = -r.get("balance", 0)  # Negatief -> positief voor omzet
         if week_str and balance != 0:
             # Parse "W01 2025" of "Week 01 2025" format
-            try:
-                # Zoek weeknummer en jaar met regex
-                match = re.search(r'W?(?:eek\s*)?(\d+)\s+(\d{4})', week_str, re.IGNORECASE)
-                if match:
-                    week_num = int(match.group(1))
-                    week_year = int(match.group(2))
-                    # Maak datum van eerste dag van de week (maandag)
-                    # ISO week: gebruik isocalendar format
-                    date = datetime.strptime(f"{week_year}-W{week_num:02d}-1", "%G-W%V-%u")
-                    weekly_data.append({
-                        "week": week_str,
-                        "week_num": week_num,
-                        "date": date.strftime("%Y-%m-%d"),
-                        "omzet": balance
-                    })
-            except:
-                pass
+            match = _WEEK_LABEL_RE.search(week_str)
+            if match:
+                week_num = int(match.group(1))
+                week_year = int(match.group(2))
+                # Maandag van de ISO week, direct uit (jaar, week) zonder string parsing
+                try:
+                    date = datetime.fromisocalendar(week_year, week_num, 1)
+                except ValueError:
+                    continue
+                weekly_data.append({
+                    "week": week_str,
+                    "week_num": week_num,
+                    "date": date.strftime("%Y-%m-%d"),
+                    "omzet": balance
+                })
     
     # Sorteer op datum
     weekly_data.sort(key=lambda x: x.get("date", ""))
@@ -978,21 +1135,15 @@ def get_daily_revenue(year, company_id=None, exclude_intercompany=False):
     if company_id:
         domain.append(("company_id", "=", company_id))
     if exclude_intercompany and INTERCOMPANY_PARTNERS:
-        domain.append(("partner_id", "not in", INTERCOMPANY_PARTNERS))
+        domain.append(NON_IC_PARTNER_DOMAIN)
+    # Nulregels dragen niets bij aan de som: server-side overslaan
+    domain.append(("balance", "!=", 0))
     
     # Groepeer op dag
     result = odoo_read_group("account.move.line", domain, ["balance:sum"], ["date:day"])
     
     # Converteer naar lijst met datum en omzet
     daily_data = []
-    # Nederlandse maand mapping
-    dutch_months = {
-        'jan': '01', 'feb': '02', 'mrt': '03', 'apr': '04',
-        'mei': '05', 'jun': '06', 'jul': '07', 'aug': '08',
-        'sep': '09', 'okt': '10', 'nov': '11', 'dec': '12',
-        # Engels als fallback
-        'mar': '03', 'may': '05', 'oct': '10'
-    }
     for r in result:
         date_str = r.get("date:day", "")
         balance = -r.get("balance", 0)  # Negatief -> positief voor omzet
@@ -1002,7 +1153,7 @@ def get_daily_revenue(year, company_id=None, exclude_intercompany=False):
                 parts = date_str.lower().split()
                 if len(parts) == 3:
                     day = parts[0].zfill(2)
-                    month = dutch_months.get(parts[1][:3], "01")
+                    month = _DAY_LABEL_MONTHS.get(parts[1][:3], "01")
                     year = parts[2]
                     iso_date = f"{year}-{month}-{day}"
                     daily_data.append({
@@ -1034,7 +1185,7 @@ def get_revenue_data(year, company_id=None):
     return odoo_call(
         "account.move.line", "search_read",
         domain,
-        ["date", "account_id", "company_id", "balance", "name", "partner_id"],
+        ["account_id", "balance", "partner_id"],  # alleen velden die verwerkt worden
         limit=100000,
         include_archived=True  # Inclusief gearchiveerde records
     )
@@ -1057,7 +1208,7 @@ def get_cost_data(year, company_id=None):
     return odoo_call(
         "account.move.line", "search_read",
         domain,
-        ["date", "account_id", "company_id", "balance", "name", "partner_id"],
+        ["account_id", "balance", "partner_id"],  # alleen velden die verwerkt worden
         limit=100000,
         include_archived=True  # Inclusief gearchiveerde records
     )
@@ -1074,14 +1225,6 @@ def get_receivables_payables(company_id=None):
     if company_id:
         rec_domain.append(["company_id", "=", company_id])
     
-    receivables = odoo_call(
-        "account.move.line", "search_read",
-        rec_domain,
-        ["company_id", "amount_residual", "partner_id"],
-        limit=5000,
-        include_archived=True  # Inclusief gearchiveerde contacten
-    )
-    
     # Crediteuren
     pay_domain = [
         ["account_id.account_type", "=", "liability_payable"],
@@ -1091,13 +1234,18 @@ def get_receivables_payables(company_id=None):
     if company_id:
         pay_domain.append(["company_id", "=", company_id])
     
-    payables = odoo_call(
-        "account.move.line", "search_read",
-        pay_domain,
-        ["company_id", "amount_residual", "partner_id"],
-        limit=5000,
-        include_archived=True  # Inclusief gearchiveerde contacten
-    )
+    # Beide queries zijn onafhankelijk: parallel ophalen
+    receivables, payables = odoo_call_many([
+        {
+            "model": "account.move.line",
+            "method": "search_read",
+            "domain": domain,
+            "fields": ["company_id", "amount_residual", "partner_id"],
+            "limit": 5000,
+            "include_archived": True,  # Inclusief gearchiveerde contacten
+        }
+        for domain in (rec_domain, pay_domain)
+    ])
     
     return receivables, payables
 
@@ -1140,7 +1288,7 @@ def get_invoices(year, company_id=None, invoice_type=None, state=None, search_te
 
 @st.cache_data(ttl=300)
 def get_product_sales(year, company_id=None):
-    """Haal verkopen per productcategorie op"""
+    """Haal verkopen per product op (server-side opgeteld, één rij per product)"""
     domain = [
         ["move_id.move_type", "=", "out_invoice"],
         ["move_id.state", "=", "posted"],
@@ -1151,13 +1299,20 @@ def get_product_sales(year, company_id=None):
     if company_id:
         domain.append(["company_id", "=", company_id])
     
-    return odoo_call(
-        "account.move.line", "search_read",
-        domain,
-        ["product_id", "price_subtotal", "quantity", "company_id"],
-        limit=10000,
-        include_archived=True  # Inclusief gearchiveerde producten
+    # read_group draait met active_test=False, dus gearchiveerde producten tellen mee
+    rows = odoo_read_group(
+        "account.move.line", domain,
+        ["price_subtotal:sum", "quantity:sum"],
+        ["product_id"]
     )
+    return [
+        {
+            "product_id": r.get("product_id"),
+            "price_subtotal": r.get("price_subtotal", 0) or 0,
+            "quantity": r.get("quantity", 0) or 0,
+        }
+        for r in rows
+    ]
 
 @st.cache_data(ttl=300)
 def get_product_categories_for_ids(product_ids_tuple):
@@ -1181,18 +1336,6 @@ def get_product_categories_for_ids(product_ids_tuple):
     )
     return {p["id"]: p.get("categ_id", [None, "Onbekend"]) for p in products}
 
-@st.cache_data(ttl=300)
-def get_product_categories():
-    """Backward compatibility - haalt eerste batch producten op"""
-    products = odoo_call(
-        "product.product", "search_read",
-        [],
-        ["id", "name", "categ_id"],
-        limit=50000,
-        include_archived=True
-    )
-    return {p["id"]: p.get("categ_id", [None, "Onbekend"]) for p in products}
-
 @st.cache_data(ttl=300)
 def get_pos_product_sales(year, company_id=None):
     """Haal POS verkopen op met productinfo (voor LAB Conceptstore)"""
@@ -1208,7 +1351,7 @@ def get_pos_product_sales(year, company_id=None):
     orders = odoo_call(
         "pos.order", "search_read",
         domain,
-        ["id", "name", "date_order", "amount_total"],
+        ["id"],  # alleen de order IDs zijn nodig voor de regels
         limit=50000,
         include_archived=True
     )
@@ -1222,7 +1365,7 @@ def get_pos_product_sales(year, company_id=None):
     lines = odoo_call(
         "pos.order.line", "search_read",
         [["order_id", "in", order_ids]],
-        ["product_id", "price_subtotal_incl", "price_subtotal", "qty", "order_id"],
+        ["product_id", "price_subtotal", "qty"],
         limit=100000,
         include_archived=True
     )
@@ -1267,7 +1410,7 @@ def get_pos_product_sales_with_dates(year, company_id=None):
     orders = odoo_call(
         "pos.order", "search_read",
         domain,
-        ["id", "name", "date_order", "amount_total"],
+        ["id", "date_order"],
         limit=50000,
         include_archived=True
     )
@@ -1286,7 +1429,7 @@ def get_pos_product_sales_with_dates(year, company_id=None):
     lines = odoo_call(
         "pos.order.line", "search_read",
         [["order_id", "in", order_ids]],
-        ["product_id", "price_subtotal_incl", "price_subtotal", "qty", "order_id"],
+        ["product_id", "price_subtotal", "qty", "order_id"],
         limit=100000,
         include_archived=True
     )
@@ -1331,50 +1474,29 @@ def get_verf_behang_analysis(year):
     if not lines:
         return None
     
-    # Groepeer per factuur
-    invoices = {}
-    for line in lines:
-        move_id = line["move_id"][0] if line["move_id"] else None
-        if not move_id:
-            continue
-        if move_id not in invoices:
-            invoices[move_id] = []
-        invoices[move_id].append(line)
+    # Kolomsgewijs: één rij per factuurregel (many2one -> id)
+    df = pd.DataFrame({
+        "move_id": [line["move_id"][0] if line.get("move_id") else None for line in lines],
+        "product_id": [line["product_id"][0] if line.get("product_id") else None for line in lines],
+        "amount": [line.get("price_subtotal", 0) or 0 for line in lines],
+    })
+    df = df[df["move_id"].notna()]
     
-    # Analyseer per factuur
-    verf_omzet = 0
-    verf_materiaal = 0
-    behang_omzet = 0
-    behang_materiaal = 0
+    # Bepaal type factuur op basis van Arbeid regels
+    is_verf_line = df["product_id"] == ARBEID_VERF_ID
+    is_behang_line = df["product_id"].isin(ARBEID_BEHANG_IDS)
+    is_verf = is_verf_line.groupby(df["move_id"]).transform("any")
+    is_behang = is_behang_line.groupby(df["move_id"]).transform("any")
     
-    for move_id, lines in invoices.items():
-        # Bepaal type factuur op basis van Arbeid regels
-        is_verf = False
-        is_behang = False
-        
-        for line in lines:
-            product_id = line["product_id"][0] if line["product_id"] else None
-            if product_id == ARBEID_VERF_ID:
-                is_verf = True
-            elif product_id in ARBEID_BEHANG_IDS:
-                is_behang = True
-        
-        # Tel omzet en materiaal
-        if is_verf or is_behang:
-            for line in lines:
-                product_id = line["product_id"][0] if line["product_id"] else None
-                amount = line.get("price_subtotal", 0) or 0
-                
-                if is_behang and not is_verf:  # Alleen behang
-                    if product_id in ARBEID_BEHANG_IDS:
-                        behang_omzet += amount
-                    else:
-                        behang_materiaal += amount
-                elif is_verf:  # Verf (ook als beide, default naar verf)
-                    if product_id == ARBEID_VERF_ID:
-                        verf_omzet += amount
-                    elif product_id not in ARBEID_BEHANG_IDS:
-                        verf_materiaal += amount
+    # Verf (ook als beide, default naar verf); anders alleen behang
+    verf_moves = is_verf
+    behang_moves = is_behang & ~is_verf
+    amount = df["amount"]
+    
+    verf_omzet = float(amount[verf_moves & is_verf_line].sum())
+    verf_materiaal = float(amount[verf_moves & ~is_verf_line & ~is_behang_line].sum())
+    behang_omzet = float(amount[behang_moves & is_behang_line].sum())
+    behang_materiaal = float(amount[behang_moves & ~is_behang_line].sum())
     
     return {
         "verf": {"omzet": verf_omzet, "materiaal": verf_materiaal},
@@ -1703,61 +1825,54 @@ def get_top_products(year, company_id=None, limit=20):
         ["move_id.state", "=", "posted"],
         ["move_id.invoice_date", ">=", f"{year}-01-01"],
         ["move_id.invoice_date", "<=", f"{year}-12-31"],
+        # Regels zonder product al in het domein uitsluiten: anders kan de
+        # product_id=False groep een van de `limit` plekken innemen
         ["product_id", "!=", False]
     ]
     if company_id:
         domain.append(["company_id", "=", company_id])
     
-    lines = odoo_call(
-        "account.move.line", "search_read",
-        domain,
-        ["product_id", "price_subtotal", "quantity"],
-        limit=100000,
-        include_archived=True
+    # Groeperen, sorteren en top N laat Odoo doen: alleen `limit` rijen over de lijn
+    rows = odoo_read_group(
+        "account.move.line", domain,
+        ["price_subtotal:sum", "quantity:sum"],
+        ["product_id"],
+        orderby="price_subtotal desc",
+        limit=limit
     )
-    
-    # Groepeer per product
-    products = {}
-    for line in lines:
-        prod = line.get("product_id")
-        if prod:
-            prod_id = prod[0]
-            prod_name = prod[1]
-            if prod_id not in products:
-                products[prod_id] = {"name": prod_name, "omzet": 0, "aantal": 0}
-            products[prod_id]["omzet"] += line.get("price_subtotal", 0)
-            products[prod_id]["aantal"] += line.get("quantity", 0)
-    
-    # Sorteer en return top N
-    sorted_products = sorted(products.values(), key=lambda x: -x["omzet"])
-    return sorted_products[:limit]
+    return [
+        {
+            "name": r["product_id"][1],
+            "omzet": r.get("price_subtotal", 0) or 0,
+            "aantal": r.get("quantity", 0) or 0,
+        }
+        for r in rows
+    ]
 
 @st.cache_data(ttl=300)
 def get_customer_locations(company_id=3):
     """Haal klantlocaties op voor LAB Projects (of andere entiteit)"""
-    # Haal alle klanten met adressen op die facturen hebben gehad
-    invoices = odoo_call(
-        "account.move", "search_read",
+    # Omzet en aantal facturen per klant server-side laten optellen (één rij per klant)
+    per_partner = odoo_read_group(
+        "account.move",
         [
             ["company_id", "=", company_id],
             ["move_type", "=", "out_invoice"],
             ["state", "=", "posted"]
         ],
-        ["partner_id", "amount_total"],
-        limit=5000,
-        include_archived=True
+        ["amount_total:sum"],
+        ["partner_id"]
     )
     
-    # Verzamel unieke klant IDs met omzet
-    customer_revenue = {}
-    for inv in invoices:
-        partner = inv.get("partner_id")
-        if partner:
-            pid = partner[0]
-            if pid not in customer_revenue:
-                customer_revenue[pid] = {"name": partner[1], "omzet": 0, "facturen": 0}
-            customer_revenue[pid]["omzet"] += inv.get("amount_total", 0)
-            customer_revenue[pid]["facturen"] += 1
+    customer_revenue = {
+        r["partner_id"][0]: {
+            "name": r["partner_id"][1],
+            "omzet": r.get("amount_total", 0) or 0,
+            "facturen": r.get("__count", 0),
+        }
+        for r in per_partner
+        if r.get("partner_id")
+    }
     
     if not customer_revenue:
         return []
@@ -1819,108 +1934,75 @@ def get_invoice_pdf(invoice_id):
 # GEOCODING HELPER (voor klantenkaart)
 # =============================================================================
 
-# Nederlandse postcodes naar lat/lon (vereenvoudigd - eerste 2 cijfers)
-POSTCODE_COORDS = {
-    "10": (52.3676, 4.9041),   # Amsterdam
-    "11": (52.3676, 4.9041),   # Amsterdam
-    "12": (52.0907, 5.1214),   # Utrecht
-    "13": (52.1561, 4.4858),   # Leiden
-    "14": (52.0116, 4.3571),   # Den Haag
-    "15": (52.0116, 4.3571),   # Den Haag
-    "16": (52.0116, 4.3571),   # Den Haag
-    "17": (51.9225, 4.4792),   # Rotterdam
-    "18": (51.9225, 4.4792),   # Rotterdam
-    "19": (51.9225, 4.4792),   # Rotterdam
-    "20": (51.9225, 4.4792),   # Rotterdam
-    "21": (51.9225, 4.4792),   # Rotterdam
-    "22": (51.9225, 4.4792),   # Rotterdam
-    "23": (51.9225, 4.4792),   # Rotterdam
-    "24": (51.9225, 4.4792),   # Rotterdam
-    "25": (51.9851, 5.8987),   # Nijmegen
-    "26": (51.9851, 5.8987),   # Nijmegen
-    "27": (52.2215, 6.8937),   # Enschede
-    "28": (52.5168, 6.0830),   # Zwolle
-    "29": (52.5168, 6.0830),   # Zwolle
-    "30": (52.0907, 5.1214),   # Utrecht
-    "31": (52.0907, 5.1214),   # Utrecht
-    "32": (52.2215, 6.0833),   # Amersfoort
-    "33": (52.2215, 6.0833),   # Amersfoort
-    "34": (52.0907, 5.1214),   # Utrecht
-    "35": (52.1561, 4.4858),   # Hilversum
-    "36": (52.0907, 5.1214),   # Utrecht
-    "37": (52.2215, 6.0833),   # Amersfoort
-    "38": (52.5200, 5.4700),   # Lelystad
-    "39": (52.2215, 6.0833),   # Amersfoort
-    "40": (51.4416, 5.4697),   # Eindhoven
-    "41": (51.4416, 5.4697),   # Eindhoven
-    "42": (51.4416, 5.4697),   # Eindhoven
-    "43": (51.5555, 5.0913),   # Tilburg
-    "44": (51.5890, 4.7756),   # Breda
-    "45": (51.5890, 4.7756),   # Breda
-    "46": (51.5890, 4.7756),   # Breda
-    "47": (51.5890, 4.7756),   # Breda
-    "48": (51.4416, 5.4697),   # Eindhoven
-    "49": (51.5555, 5.0913),   # Tilburg
-    "50": (51.4416, 5.4697),   # Eindhoven
-    "51": (51.4416, 5.4697),   # Eindhoven
-    "52": (51.4416, 5.4697),   # Eindhoven
-    "53": (51.4416, 5.4697),   # Eindhoven
-    "54": (51.4416, 5.4697),   # Eindhoven
-    "55": (51.4416, 5.4697),   # Eindhoven
-    "56": (51.4416, 5.4697),   # Eindhoven
-    "57": (51.4416, 5.4697),   # Eindhoven
-    "58": (51.4416, 5.4697),   # Eindhoven
-    "59": (51.5555, 5.0913),   # Tilburg
-    "60": (50.8514, 5.6910),   # Maastricht
-    "61": (50.8514, 5.6910),   # Maastricht
-    "62": (50.8514, 5.6910),   # Maastricht
-    "63": (50.8514, 5.6910),   # Maastricht
-    "64": (50.8514, 5.6910),   # Maastricht
-    "65": (51.4427, 6.0608),   # Roermond
-    "66": (51.4427, 6.0608),   # Roermond
-    "67": (51.9851, 5.8987),   # Nijmegen
-    "68": (51.9851, 5.8987),   # Nijmegen
-    "69": (51.9225, 6.0833),   # Arnhem
-    "70": (51.9225, 6.0833),   # Arnhem
-    "71": (51.9851, 5.8987),   # Nijmegen
-    "72": (52.0116, 6.0833),   # Apeldoorn
-    "73": (52.0116, 6.0833),   # Apeldoorn
-    "74": (52.0116, 6.0833),   # Apeldoorn
-    "75": (52.2215, 6.8937),   # Enschede
-    "76": (52.2215, 6.8937),   # Enschede
-    "77": (52.2215, 6.8937),   # Enschede
-    "78": (52.5168, 6.0830),   # Zwolle
-    "79": (52.5168, 6.0830),   # Zwolle
-    "80": (52.5168, 6.0830),   # Zwolle
-    "81": (52.5168, 6.0830),   # Zwolle
-    "82": (52.7792, 6.9004),   # Emmen
-    "83": (52.7792, 6.9004),   # Emmen
-    "84": (53.2194, 6.5665),   # Groningen
-    "85": (53.2194, 6.5665),   # Groningen
-    "86": (53.2194, 6.5665),   # Groningen
-    "87": (53.2194, 6.5665),   # Groningen
-    "88": (53.0000, 5.7500),   # Leeuwarden
-    "89": (53.0000, 5.7500),   # Leeuwarden
-    "90": (53.0000, 5.7500),   # Leeuwarden
-    "91": (53.0000, 5.7500),   # Leeuwarden
-    "92": (53.0000, 5.7500),   # Leeuwarden
-    "93": (53.2194, 6.5665),   # Groningen
-    "94": (53.2194, 6.5665),   # Groningen
-    "95": (53.2194, 6.5665),   # Groningen
-    "96": (53.2194, 6.5665),   # Groningen
-    "97": (53.2194, 6.5665),   # Groningen
-    "98": (53.2194, 6.5665),   # Groningen
-    "99": (53.2194, 6.5665),   # Groningen
+# Eén (lat, lon) tuple per stad; alle postcodegebieden van een stad delen dat object
+POSTCODE_CITY_COORDS = {
+    "Amsterdam": (52.3676, 4.9041),
+    "Utrecht": (52.0907, 5.1214),
+    "Leiden": (52.1561, 4.4858),
+    "Den Haag": (52.0116, 4.3571),
+    "Rotterdam": (51.9225, 4.4792),
+    "Nijmegen": (51.9851, 5.8987),
+    "Enschede": (52.2215, 6.8937),
+    "Zwolle": (52.5168, 6.0830),
+    "Amersfoort": (52.2215, 6.0833),
+    "Hilversum": (52.1561, 4.4858),
+    "Lelystad": (52.5200, 5.4700),
+    "Eindhoven": (51.4416, 5.4697),
+    "Tilburg": (51.5555, 5.0913),
+    "Breda": (51.5890, 4.7756),
+    "Maastricht": (50.8514, 5.6910),
+    "Roermond": (51.4427, 6.0608),
+    "Arnhem": (51.9225, 6.0833),
+    "Apeldoorn": (52.0116, 6.0833),
+    "Emmen": (52.7792, 6.9004),
+    "Groningen": (53.2194, 6.5665),
+    "Leeuwarden": (53.0000, 5.7500),
 }
 
-def get_coords_from_postcode(postcode):
-    """Haal lat/lon op basis van postcode (eerste 2 cijfers)"""
-    if not postcode:
-        return None, None
-    prefix = str(postcode).strip()[:2]
-    if prefix in POSTCODE_COORDS:
-        return POSTCODE_COORDS[prefix]
-    return None, None
+# Postcodeprefix (eerste 2 cijfers) -> stad
+POSTCODE_PREFIX_CITY = {
+    "10": "Amsterdam", "11": "Amsterdam", "12": "Utrecht", "13": "Leiden", "14": "Den Haag",
+    "15": "Den Haag", "16": "Den Haag", "17": "Rotterdam", "18": "Rotterdam", "19": "Rotterdam",
+    "20": "Rotterdam", "21": "Rotterdam", "22": "Rotterdam", "23": "Rotterdam",
+    "24": "Rotterdam", "25": "Nijmegen", "26": "Nijmegen", "27": "Enschede", "28": "Zwolle",
+    "29": "Zwolle", "30": "Utrecht", "31": "Utrecht", "32": "Amersfoort", "33": "Amersfoort",
+    "34": "Utrecht", "35": "Hilversum", "36": "Utrecht", "37": "Amersfoort", "38": "Lelystad",
+    "39": "Amersfoort", "40": "Eindhoven", "41": "Eindhoven", "42": "Eindhoven",
+    "43": "Tilburg", "44": "Breda", "45": "Breda", "46": "Breda", "47": "Breda",
+    "48": "Eindhoven", "49": "Tilburg", "50": "Eindhoven", "51": "Eindhoven", "52": "Eindhoven",
+    "53": "Eindhoven", "54": "Eindhoven", "55": "Eindhoven", "56": "Eindhoven",
+    "57": "Eindhoven", "58": "Eindhoven", "59": "Tilburg", "60": "Maastricht",
+    "61": "Maastricht", "62": "Maastricht", "63": "Maastricht", "64": "Maastricht",
+    "65": "Roermond", "66": "Roermond", "67": "Nijmegen", "68": "Nijmegen", "69": "Arnhem",
+    "70": "Arnhem", "71": "Nijmegen", "72": "Apeldoorn", "73": "Apeldoorn", "74": "Apeldoorn",
+    "75": "Enschede", "76": "Enschede", "77": "Enschede", "78": "Zwolle", "79": "Zwolle",
+    "80": "Zwolle", "81": "Zwolle", "82": "Emmen", "83": "Emmen", "84": "Groningen",
+    "85": "Groningen", "86": "Groningen", "87": "Groningen", "88": "Leeuwarden",
+    "89": "Leeuwarden", "90": "Leeuwarden", "91": "Leeuwarden", "92": "Leeuwarden",
+    "93": "Groningen", "94": "Groningen", "95": "Groningen", "96": "Groningen",
+    "97": "Groningen", "98": "Groningen", "99": "Groningen",
+}
+
+# Nederlandse postcodes naar lat/lon (vereenvoudigd - eerste 2 cijfers)
+POSTCODE_COORDS = {prefix: POSTCODE_CITY_COORDS[city] for prefix, city in POSTCODE_PREFIX_CITY.items()}
+
+# Zelfde tabel als arrays geïndexeerd op het numerieke prefix (0-99), NaN = onbekend
+_POSTCODE_LAT = np.full(100, np.nan)
+_POSTCODE_LON = np.full(100, np.nan)
+for _prefix, (_lat, _lon) in POSTCODE_COORDS.items():
+    _POSTCODE_LAT[int(_prefix)] = _lat
+    _POSTCODE_LON[int(_prefix)] = _lon
+del _prefix, _lat, _lon
+
+def get_coords_batch(postcodes):
+    """Haal lat/lon arrays op basis van postcodes (eerste 2 cijfers), NaN voor onbekende postcodes"""
+    prefixes = pd.Series(postcodes, dtype=object).fillna("").astype(str).str.strip().str[:2]
+    valid = prefixes.str.fullmatch(r"[0-9]{2}").to_numpy(dtype=bool)
+    idx = np.zeros(len(prefixes), dtype=np.intp)
+    idx[valid] = prefixes[valid].astype(int).to_numpy()
+    lat = np.where(valid, _POSTCODE_LAT[idx], np.nan)
+    lon = np.where(valid, _POSTCODE_LON[idx], np.nan)
+    return lat, lon
 
 # =============================================================================
 # FINANCIAL FORECAST MODULE
@@ -1945,6 +2027,11 @@ from io import BytesIO
 # Forecast storage directory
 FORECAST_STORAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "forecasts")
 
+# On-disk cache for read_group results over closed periods (see _read_group_disk_ttl)
+READ_GROUP_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "read_group_cache")
+READ_GROUP_CACHE_TTL_CLOSED_YEAR = 30 * 24 * 3600
+READ_GROUP_CACHE_TTL_CLOSED_MONTH = 24 * 3600
+
 # Default account mapping for forecast categories
 # Users can customize this mapping in the Forecast tab
 DEFAULT_ACCOUNT_MAPPING = {
@@ -2977,6 +3064,32 @@ def calculate_forecast_metrics(forecast):
         "avg_net_margin": sum(net_margin) / num_periods if num_periods > 0 else 0
     }
 
+def _read_group_monthly_for_patterns(base_domain, patterns):
+    """Monthly balance:sum read_group rows for every account prefix in patterns."""
+    rows = []
+    for pattern in patterns:
+        rows.extend(odoo_read_group(
+            "account.move.line",
+            base_domain + [["account_id.code", "=like", f"{pattern}%"]],
+            ["balance:sum"],
+            ["date:month"]
+        ))
+    return rows
+
+def _sum_balance_by_year_month(rows):
+    """Sum the balance of date:month read_group rows into {(year, month): total}."""
+    totals = {}
+    for item in rows:
+        label = item.get("date:month")
+        month = _month_to_int(label)
+        year_match = re.search(r"\d{4}", str(label or ""))
+        if not month or not year_match:
+            continue
+        key = (int(year_match.group()), month)
+        # read_group returns the aggregate under "balance"; "balance:sum" kept as fallback
+        totals[key] = totals.get(key, 0) + (item.get("balance:sum", item.get("balance", 0)) or 0)
+    return totals
+
 def get_actual_data_for_comparison(company_id, start_date, num_months, revenue_patterns=None, cogs_patterns=None, expense_categories=None):
     """
     Fetch actual financial data from Odoo for comparison with forecast.
@@ -3015,67 +3128,36 @@ def get_actual_data_for_comparison(company_id, start_date, num_months, revenue_p
         if company_id:
             base_domain.append(["company_id", "=", company_id])
 
-        # Fetch revenue using configured account patterns
-        revenue_data = []
-        for pattern in revenue_patterns:
-            revenue_domain = base_domain + [["account_id.code", "=like", f"{pattern}%"]]
-            data = odoo_read_group(
-                "account.move.line",
-                revenue_domain,
-                ["balance:sum"],
-                ["date:month"]
-            )
-            revenue_data.extend(data)
-
-        # Fetch COGS using configured account patterns
-        cogs_data = []
-        for pattern in cogs_patterns:
-            cogs_domain = base_domain + [["account_id.code", "=like", f"{pattern}%"]]
-            data = odoo_read_group(
-                "account.move.line",
-                cogs_domain,
-                ["balance:sum"],
-                ["date:month"]
-            )
-            cogs_data.extend(data)
-
-        # Fetch operating expenses using configured categories
-        expenses_by_category = {}
-        for cat_code in expense_categories.keys():
-            exp_domain = base_domain + [["account_id.code", "=like", f"{cat_code}%"]]
-            exp_data = odoo_read_group(
-                "account.move.line",
-                exp_domain,
-                ["balance:sum"],
-                ["date:month"]
-            )
-            expenses_by_category[cat_code] = exp_data
+        # Fetch revenue, COGS and operating expenses using configured account patterns
+        revenue_data = _read_group_monthly_for_patterns(base_domain, revenue_patterns)
+        cogs_data = _read_group_monthly_for_patterns(base_domain, cogs_patterns)
+        expenses_by_category = {
+            cat_code: _read_group_monthly_for_patterns(base_domain, [cat_code])
+            for cat_code in expense_categories.keys()
+        }
 
         # Convert to monthly arrays
         months = []
+        month_keys = []
         current = start
         for i in range(num_months):
             months.append(current.strftime("%B %Y"))
+            month_keys.append((current.year, current.month))
             current = (current + timedelta(days=32)).replace(day=1)
 
-        # Helper to sum all values for a month (aggregates multiple entries from different account patterns)
-        def get_month_value(data_list, month_str):
-            total = 0
-            for item in data_list:
-                if item.get("date:month") == month_str:
-                    total += item.get("balance:sum", 0)
-            return total
-
-        actual_revenue = []
-        actual_cogs = []
-        for month in months:
-            # Revenue is negative in Odoo, flip sign
-            actual_revenue.append(-get_month_value(revenue_data, month))
-            actual_cogs.append(get_month_value(cogs_data, month))
+        # One pass per result set (aggregates multiple entries from different account patterns);
+        # keyed on (jaar, maand) so Dutch Odoo labels ("januari 2026") match as well
+        revenue_by_month = _sum_balance_by_year_month(revenue_data)
+        cogs_by_month = _sum_balance_by_year_month(cogs_data)
+
+        # Revenue is negative in Odoo, flip sign
+        actual_revenue = [-revenue_by_month.get(k, 0) for k in month_keys]
+        actual_cogs = [cogs_by_month.get(k, 0) for k in month_keys]
 
         actual_expenses = {}
         for cat_code, cat_data in expenses_by_category.items():
-            actual_expenses[cat_code] = [get_month_value(cat_data, m) for m in months]
+            cat_by_month = _sum_balance_by_year_month(cat_data)
+            actual_expenses[cat_code] = [cat_by_month.get(k, 0) for k in month_keys]
 
         return {
             "revenue": actual_revenue,
@@ -3129,6 +3211,8 @@ def discover_account_groups(company_id, year):
                 account_groups[prefix]["accounts"].append(account)
 
         return account_groups
+    except requests.exceptions.RequestException:
+        raise
     except Exception as e:
         print(f"Error discovering account groups: {e}")
         return {}
@@ -3240,6 +3324,15 @@ def get_draggable_mapping():
     return st.session_state.draggable_mapping
 
 
+def _undo_pending_mapping_change(pending_key, cat_key, acc_code):
+    """Callback: haal een rekening uit pending_adds/pending_removes."""
+    pending = st.session_state.get(pending_key, {})
+    if acc_code in pending.get(cat_key, []):
+        pending[cat_key].remove(acc_code)
+        if not pending[cat_key]:
+            del pending[cat_key]
+
+
 def render_draggable_mapping_tool(company_id, year):
     """
     Render the mapping tool interface with two-column layout:
@@ -3538,7 +3631,7 @@ def render_draggable_mapping_tool(company_id, year):
                 # Show assigned accounts when expanded (including pending changes visualization)
                 if st.session_state.get(expand_key, False):
                     # First show current accounts (excluding pending removes)
-                    for i, acc_code in enumerate(current_accounts):
+                    for acc_code in current_accounts:
                         is_pending_remove = acc_code in cat_pending_removes
                         acc = account_lookup.get(acc_code)
                         acc_name = acc["name"][:35] if acc else "Onbekend"
@@ -3552,13 +3645,13 @@ def render_draggable_mapping_tool(company_id, year):
                         with acc_col2:
                             if is_pending_remove:
                                 # Undo remove button
-                                if st.button("↩️", key=f"undo_rm_{cat_key}_{i}", help="Ongedaan maken"):
-                                    st.session_state.pending_removes[cat_key].remove(acc_code)
-                                    if not st.session_state.pending_removes[cat_key]:
-                                        del st.session_state.pending_removes[cat_key]
-                                    st.rerun()
+                                st.button(
+                                    "↩️", key=f"undo_rm_{cat_key}_{acc_code}", help="Ongedaan maken",
+                                    on_click=_undo_pending_mapping_change,
+                                    args=("pending_removes", cat_key, acc_code)
+                                )
                             else:
-                                if st.button("✕", key=f"rm_{cat_key}_{i}", help="Verwijder"):
+                                if st.button("✕", key=f"rm_{cat_key}_{acc_code}", help="Verwijder"):
                                     if edit_mode:
                                         # In edit mode: add to pending removes
                                         if cat_key not in st.session_state.pending_removes:
@@ -3574,7 +3667,7 @@ def render_draggable_mapping_tool(company_id, year):
                                         st.rerun()
 
                     # Show pending adds (in edit mode)
-                    for i, acc_code in enumerate(cat_pending_adds):
+                    for acc_code in cat_pending_adds:
                         acc = account_lookup.get(acc_code)
                         acc_name = acc["name"][:35] if acc else "Onbekend"
                         acc_col1, acc_col2 = st.columns([4.5, 0.5])
@@ -3582,11 +3675,11 @@ def render_draggable_mapping_tool(company_id, year):
                             st.caption(f"{indent}　　`{acc_code}` - {acc_name} ✅ _toe te voegen_")
                         with acc_col2:
                             # Undo add button
-                            if st.button("↩️", key=f"undo_add_{cat_key}_{i}", help="Ongedaan maken"):
-                                st.session_state.pending_adds[cat_key].remove(acc_code)
-                                if not st.session_state.pending_adds[cat_key]:
-                                    del st.session_state.pending_adds[cat_key]
-                                st.rerun()
+                            st.button(
+                                "↩️", key=f"undo_add_{cat_key}_{acc_code}", help="Ongedaan maken",
+                                on_click=_undo_pending_mapping_change,
+                                args=("pending_adds", cat_key, acc_code)
+                            )
 
                 # Show add dialog if active
                 if st.session_state.get(f"adding_to_{cat_key}", False):
@@ -3857,18 +3950,41 @@ def calculate_report_with_mapping(company_id, year, mapping=None):
     return results
 
 
+@lru_cache(maxsize=None)
+def _report_category_index():
+    """
+    Invariant views on REPORT_CATEGORIES (fixed after module import), computed once:
+    leaf keys, sorted keys, sorted subtotal keys and lowercase key/name lookups for leaves.
+    """
+    leaf_keys = tuple(k for k, v in REPORT_CATEGORIES.items() if not v.get("is_subtotal", False))
+    sorted_items = sorted(REPORT_CATEGORIES.items(), key=lambda item: item[1].get("order", 999))
+    sorted_keys = tuple(k for k, _ in sorted_items)
+    sorted_subtotal_keys = tuple(k for k, v in sorted_items if v.get("is_subtotal", False))
+    leaf_by_lower_key = {}
+    for key in leaf_keys:
+        leaf_by_lower_key.setdefault(key.lower(), key)
+    leaf_by_lower_name = {}
+    for key in leaf_keys:
+        leaf_by_lower_name.setdefault(REPORT_CATEGORIES[key].get("name", "").lower(), key)
+    return {
+        "leaf_keys": leaf_keys,
+        "sorted_keys": sorted_keys,
+        "sorted_subtotal_keys": sorted_subtotal_keys,
+        "leaf_by_lower_key": leaf_by_lower_key,
+        "leaf_by_lower_name": leaf_by_lower_name,
+    }
+
+
 def get_leaf_report_category_keys():
     """Return report categories that require direct account mapping (non-subtotals)."""
-    return [k for k, v in REPORT_CATEGORIES.items() if not v.get("is_subtotal", False)]
+    return list(_report_category_index()["leaf_keys"])
 
 
 def get_sorted_report_categories(include_subtotals=True):
     """Return ordered list of category keys based on configured order."""
-    keys = []
-    for key, info in sorted(REPORT_CATEGORIES.items(), key=lambda item: item[1].get("order", 999)):
-        if include_subtotals or not info.get("is_subtotal", False):
-            keys.append(key)
-    return keys
+    if include_subtotals:
+        return list(_report_category_index()["sorted_keys"])
+    return [k for k in _report_category_index()["sorted_keys"] if not REPORT_CATEGORIES[k].get("is_subtotal", False)]
 
 
 def _evaluate_calculation(calculation, values_by_key):
@@ -4280,17 +4396,47 @@ def get_pnl_mapping_completion_status(company_id, year):
     }
 
 
-def build_variance_export_excel_bytes(df_month, df_matrix, metadata):
-    """Build Excel export for variance report."""
+def _excel_cell_value(value):
+    """Convert a DataFrame cell to something openpyxl can write (NaN -> empty)."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        return value.item()
+    return value
+
+
+def dataframes_to_excel_bytes(sheets):
+    """
+    Write [(sheet_name, df), ...] to xlsx bytes (no index, header row first).
+    Uses an openpyxl write-only workbook, which streams rows instead of holding
+    every cell in memory.
+    """
+    from openpyxl import Workbook
+
     output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        pd.DataFrame([metadata]).to_excel(writer, sheet_name="Meta", index=False)
-        df_month.to_excel(writer, sheet_name="Variantie_Maand", index=False)
-        df_matrix.to_excel(writer, sheet_name="Variantie_Matrix", index=False)
-    output.seek(0)
+    wb = Workbook(write_only=True)
+    for sheet_name, df in sheets:
+        ws = wb.create_sheet(title=sheet_name)
+        ws.append([str(c) for c in df.columns])
+        for row in df.itertuples(index=False, name=None):
+            ws.append([_excel_cell_value(v) for v in row])
+
+    wb.save(output)
     return output.getvalue()
 
 
+@st.cache_data(show_spinner=False, max_entries=16)
+def build_variance_export_excel_bytes(df_month, df_matrix, metadata):
+    """Build Excel export for variance report."""
+    return dataframes_to_excel_bytes([
+        ("Meta", pd.DataFrame([metadata])),
+        ("Variantie_Maand", df_month),
+        ("Variantie_Matrix", df_matrix),
+    ])
+
+
 def build_variance_export_pdf_bytes(df_month, metadata):
     """Build compact PDF export for variance report."""
     from reportlab.lib.pagesizes import A4
@@ -4381,6 +4527,14 @@ def build_budget_template_dataframe(year, company_ids=None):
     return pd.DataFrame(rows)
 
 
+@st.cache_data(show_spinner=False, max_entries=16)
+def build_budget_template_csv(year, company_ids=None):
+    """Create CSV template bytes (puntkomma-gescheiden) for budget input."""
+    template_df = build_budget_template_dataframe(year, company_ids=company_ids)
+    return template_df.to_csv(index=False, sep=";", lineterminator="\n").encode("utf-8")
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
 def build_budget_template_excel(year, company_ids=None):
     """Create Excel template with instructions + masterdata + budget input."""
     template_df = build_budget_template_dataframe(year, company_ids=company_ids)
@@ -4405,14 +4559,12 @@ def build_budget_template_excel(year, company_ids=None):
         for key in get_leaf_report_category_keys()
     ])
 
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        instructions_df.to_excel(writer, sheet_name="Instructions", index=False)
-        companies_df.to_excel(writer, sheet_name="Companies", index=False)
-        categories_df.to_excel(writer, sheet_name="Categories", index=False)
-        template_df.to_excel(writer, sheet_name="BudgetInput", index=False)
-    output.seek(0)
-    return output.getvalue()
+    return dataframes_to_excel_bytes([
+        ("Instructions", instructions_df),
+        ("Companies", companies_df),
+        ("Categories", categories_df),
+        ("BudgetInput", template_df),
+    ])
 
 
 def _normalize_company_id(raw_company):
@@ -4450,20 +4602,12 @@ def _normalize_category_key(raw_category):
     if value in REPORT_CATEGORIES and not REPORT_CATEGORIES[value].get("is_subtotal", False):
         return value
 
-    # Case-insensitive key match
-    for key in get_leaf_report_category_keys():
-        if key.lower() == value.lower():
-            return key
-
-    # Name match
+    # Case-insensitive key match, then name match
+    index = _report_category_index()
     value_lower = value.lower()
-    for key, info in REPORT_CATEGORIES.items():
-        if info.get("is_subtotal", False):
-            continue
-        if info.get("name", "").lower() == value_lower:
-            return key
-
-    return None
+    if value_lower in index["leaf_by_lower_key"]:
+        return index["leaf_by_lower_key"][value_lower]
+    return index["leaf_by_lower_name"].get(value_lower)
 
 
 def parse_budget_upload_dataframe(df, default_company_id=None):
@@ -4582,20 +4726,21 @@ def _add_report_subtotals_monthly(base_monthly):
     """Calculate subtotal categories for monthly arrays."""
     results = {k: v[:] for k, v in base_monthly.items()}
 
-    subtotal_keys = [
-        key for key in get_sorted_report_categories(include_subtotals=True)
-        if REPORT_CATEGORIES[key].get("is_subtotal", False)
-    ]
-    for subtotal_key in subtotal_keys:
-        calc = REPORT_CATEGORIES[subtotal_key].get("calculation", "")
-        series = []
-        for month_idx in range(12):
-            month_values = {
-                k: (results.get(k, [0.0] * 12)[month_idx] if isinstance(results.get(k), list) else 0.0)
-                for k in REPORT_CATEGORIES.keys()
-            }
-            series.append(_evaluate_calculation(calc, month_values))
-        results[subtotal_key] = series
+    subtotal_keys = _report_category_index()["sorted_subtotal_keys"]
+    subtotal_calcs = [(key, REPORT_CATEGORIES[key].get("calculation", "")) for key in subtotal_keys]
+    for key in subtotal_keys:
+        results[key] = [0.0] * 12
+
+    # Build the per-month value dict once; subtotals feed later subtotals in order
+    for month_idx in range(12):
+        month_values = {
+            k: (results[k][month_idx] if isinstance(results.get(k), list) else 0.0)
+            for k in REPORT_CATEGORIES.keys()
+        }
+        for subtotal_key, calc in subtotal_calcs:
+            value = _evaluate_calculation(calc, month_values)
+            month_values[subtotal_key] = value
+            results[subtotal_key][month_idx] = value
     return results
 
 
@@ -4651,7 +4796,7 @@ def calculate_monthly_report_with_mapping(company_id, year, mapping=None, exclud
             if company_id:
                 domain.append(["company_id", "=", company_id])
             if exclude_intercompany and INTERCOMPANY_PARTNERS:
-                domain.append(["partner_id", "not in", INTERCOMPANY_PARTNERS])
+                domain.append(NON_IC_PARTNER_DOMAIN)
 
             monthly_rows = odoo_read_group(
                 "account.move.line",
@@ -4719,6 +4864,12 @@ def _move_account_to_balance_category(mapping, account_code, target_category):
         mapping["categories"][target_category].append(account_code)
 
 
+def _remove_balance_account(cat_key, account_code):
+    """Callback: ontkoppel een rekening van een balansregel."""
+    categories = st.session_state.balance_mapping["categories"]
+    categories[cat_key] = [c for c in categories.get(cat_key, []) if c != account_code]
+
+
 def calculate_balance_snapshot_with_mapping(as_of_date, company_id=None, mapping=None, exclude_intercompany=False):
     """Calculate balance values per mapped balance leaf category."""
     if mapping is None:
@@ -4749,7 +4900,7 @@ def calculate_balance_snapshot_with_mapping(as_of_date, company_id=None, mapping
             if company_id:
                 domain.append(["company_id", "=", company_id])
             if exclude_intercompany and INTERCOMPANY_PARTNERS:
-                domain.append(["partner_id", "not in", INTERCOMPANY_PARTNERS])
+                domain.append(NON_IC_PARTNER_DOMAIN)
 
             data = odoo_read_group(
                 "account.move.line",
@@ -4924,16 +5075,16 @@ def render_balance_mapping_tool(company_id, year):
             with st.expander(f"[{section}] {cat_name} ({len(codes)})", expanded=False):
                 if not codes:
                     st.caption("Geen rekeningen gekoppeld.")
-                for idx, code in enumerate(codes):
+                for code in codes:
                     acc_name = account_lookup.get(code, {}).get("name", "Onbekend")
                     c1, c2 = st.columns([6, 1])
                     with c1:
                         st.caption(f"`{code}` - {acc_name}")
                     with c2:
-                        if st.button("✕", key=f"bal_rm_{cat_key}_{idx}"):
-                            categories[cat_key] = [c for c in categories[cat_key] if c != code]
-                            st.session_state.balance_mapping = mapping
-                            st.rerun()
+                        st.button(
+                            "✕", key=f"bal_rm_{cat_key}_{code}",
+                            on_click=_remove_balance_account, args=(cat_key, code)
+                        )
 
     with right_col:
         st.markdown("**Niet-gemapt (preview)**")
@@ -5103,8 +5254,7 @@ def render_budget_import_tab(selected_year, default_company_id=None):
             template_company_id = [cid for cid, cname in COMPANIES.items() if cname == template_company_name][0]
 
     template_company_ids = [template_company_id] if template_company_id else None
-    template_df = build_budget_template_dataframe(selected_year, company_ids=template_company_ids)
-    template_csv = template_df.to_csv(index=False, sep=";").encode("utf-8")
+    template_csv = build_budget_template_csv(selected_year, company_ids=template_company_ids)
     template_xlsx = build_budget_template_excel(selected_year, company_ids=template_company_ids)
 
     dl1, dl2 = st.columns(2)
@@ -5241,33 +5391,35 @@ def render_variance_analysis_tab(selected_year, report_company_id=None, exclude_
     selected_month = int(selected_month_label.split("(")[1].replace(")", ""))
     month_idx = selected_month - 1
 
-    rows = []
-    for cat_key in get_sorted_report_categories(include_subtotals=True):
-        name = REPORT_CATEGORIES[cat_key]["name"]
-        act_series = actual.get(cat_key, [0.0] * 12)
-        bud_series = budget.get(cat_key, [0.0] * 12)
-        act_val = act_series[month_idx]
-        bud_val = bud_series[month_idx]
-        var_val = act_val - bud_val
-        var_pct = (var_val / bud_val * 100) if bud_val else 0.0
-        act_ytd = sum(act_series[:month_idx + 1])
-        bud_ytd = sum(bud_series[:month_idx + 1])
-        var_ytd = act_ytd - bud_ytd
-        var_ytd_pct = (var_ytd / bud_ytd * 100) if bud_ytd else 0.0
-        rows.append({
-            "Regel": name,
-            "Actual maand": act_val,
-            "Budget maand": bud_val,
-            "Variantie maand": var_val,
-            "Variantie maand %": var_pct,
-            "Actual YTD": act_ytd,
-            "Budget YTD": bud_ytd,
-            "Variantie YTD": var_ytd,
-            "Variantie YTD %": var_ytd_pct,
-            "_subtotal": REPORT_CATEGORIES[cat_key].get("is_subtotal", False)
-        })
-
-    df_month = pd.DataFrame(rows)
+    # Categorie x maand matrices; alle varianties kolomsgewijs in één keer
+    cat_keys = get_sorted_report_categories(include_subtotals=True)
+    cat_names = [REPORT_CATEGORIES[k]["name"] for k in cat_keys]
+    zero_series = [0.0] * 12
+    act_arr = np.array([actual.get(k, zero_series) for k in cat_keys], dtype=np.float64).reshape(len(cat_keys), 12)
+    bud_arr = np.array([budget.get(k, zero_series) for k in cat_keys], dtype=np.float64).reshape(len(cat_keys), 12)
+
+    def pct_of(values, base):
+        return np.where(base != 0, values / np.where(base != 0, base, 1.0) * 100, 0.0)
+
+    act_val = act_arr[:, month_idx]
+    bud_val = bud_arr[:, month_idx]
+    var_val = act_val - bud_val
+    act_ytd = act_arr[:, :month_idx + 1].sum(axis=1)
+    bud_ytd = bud_arr[:, :month_idx + 1].sum(axis=1)
+    var_ytd = act_ytd - bud_ytd
+
+    df_month = pd.DataFrame({
+        "Regel": cat_names,
+        "Actual maand": act_val,
+        "Budget maand": bud_val,
+        "Variantie maand": var_val,
+        "Variantie maand %": pct_of(var_val, bud_val),
+        "Actual YTD": act_ytd,
+        "Budget YTD": bud_ytd,
+        "Variantie YTD": var_ytd,
+        "Variantie YTD %": pct_of(var_ytd, bud_ytd),
+        "_subtotal": [REPORT_CATEGORIES[k].get("is_subtotal", False) for k in cat_keys],
+    })
     netto_key = "Netto-omzetresultaat"
     if netto_key in df_month["Regel"].values:
         net_row = df_month[df_month["Regel"] == netto_key].iloc[0]
@@ -5307,14 +5459,8 @@ def render_variance_analysis_tab(selected_year, report_company_id=None, exclude_
 
     st.markdown("---")
     st.markdown("#### Variantiematrix per maand")
-    matrix_rows = []
-    for cat_key in get_sorted_report_categories(include_subtotals=True):
-        row = {"Regel": REPORT_CATEGORIES[cat_key]["name"]}
-        for m in range(1, 13):
-            var_val = actual.get(cat_key, [0.0] * 12)[m - 1] - budget.get(cat_key, [0.0] * 12)[m - 1]
-            row[MONTH_LABELS_NL[m]] = var_val
-        matrix_rows.append(row)
-    df_matrix = pd.DataFrame(matrix_rows)
+    df_matrix = pd.DataFrame(act_arr - bud_arr, columns=[MONTH_LABELS_NL[m] for m in range(1, 13)])
+    df_matrix.insert(0, "Regel", cat_names)
     st.dataframe(
         df_matrix.style.format({MONTH_LABELS_NL[m]: "€{:,.0f}" for m in range(1, 13)}),
         use_container_width=True,
@@ -5331,29 +5477,47 @@ def render_variance_analysis_tab(selected_year, report_company_id=None, exclude_
         "scope": scope_label,
         "exclude_intercompany": "ja" if exclude_intercompany else "nee",
     }
-    excel_bytes = build_variance_export_excel_bytes(export_month_df, df_matrix, metadata)
 
-    ex_col1, ex_col2 = st.columns(2)
-    with ex_col1:
-        st.download_button(
-            "📊 Download variatie (Excel)",
-            data=excel_bytes,
-            file_name=f"variantie_{selected_year}_{selected_month:02d}_{scope_label.replace(' ', '_').lower()}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key="variance_export_excel"
-        )
-    with ex_col2:
-        try:
-            pdf_bytes = build_variance_export_pdf_bytes(export_month_df, metadata)
+    # Exportbestanden pas opbouwen na klik; anders kost elke rerun een Excel- en PDF-build
+    export_key = (
+        selected_year, selected_month, scope_label, metadata["exclude_intercompany"],
+        int(pd.util.hash_pandas_object(export_month_df, index=False).sum()),
+        int(pd.util.hash_pandas_object(df_matrix, index=False).sum()),
+    )
+    if st.button("📦 Genereer exportbestanden", key="variance_export_prepare"):
+        export_blobs = {"key": export_key, "excel": None, "pdf": None, "pdf_error": None}
+        with st.spinner("Exportbestanden opbouwen..."):
+            export_blobs["excel"] = build_variance_export_excel_bytes(export_month_df, df_matrix, metadata)
+            try:
+                export_blobs["pdf"] = build_variance_export_pdf_bytes(export_month_df, metadata)
+            except Exception as e:
+                export_blobs["pdf_error"] = str(e)
+        st.session_state.variance_export_blobs = export_blobs
+
+    export_blobs = st.session_state.get("variance_export_blobs")
+    if export_blobs and export_blobs.get("key") == export_key:
+        ex_col1, ex_col2 = st.columns(2)
+        with ex_col1:
             st.download_button(
-                "🧾 Download variatie (PDF)",
-                data=pdf_bytes,
-                file_name=f"variantie_{selected_year}_{selected_month:02d}_{scope_label.replace(' ', '_').lower()}.pdf",
-                mime="application/pdf",
-                key="variance_export_pdf"
+                "📊 Download variatie (Excel)",
+                data=export_blobs["excel"],
+                file_name=f"variantie_{selected_year}_{selected_month:02d}_{scope_label.replace(' ', '_').lower()}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                key="variance_export_excel"
             )
-        except Exception as e:
-            st.caption(f"PDF export momenteel niet beschikbaar: {e}")
+        with ex_col2:
+            if export_blobs["pdf"] is not None:
+                st.download_button(
+                    "🧾 Download variatie (PDF)",
+                    data=export_blobs["pdf"],
+                    file_name=f"variantie_{selected_year}_{selected_month:02d}_{scope_label.replace(' ', '_').lower()}.pdf",
+                    mime="application/pdf",
+                    key="variance_export_pdf"
+                )
+            else:
+                st.caption(f"PDF export momenteel niet beschikbaar: {export_blobs['pdf_error']}")
+    else:
+        st.caption("Klik op 'Genereer exportbestanden' om Excel/PDF voor deze selectie te maken.")
 
     st.markdown("---")
     category_choice = st.selectbox(
@@ -5420,41 +5584,13 @@ def get_base_year_data(company_id, base_year, revenue_patterns=None, cogs_patter
         if company_id:
             base_domain.append(["company_id", "=", company_id])
 
-        # Fetch revenue from multiple account patterns
-        revenue_data = []
-        for pattern in revenue_patterns:
-            revenue_domain = base_domain + [["account_id.code", "=like", f"{pattern}%"]]
-            data = odoo_read_group(
-                "account.move.line",
-                revenue_domain,
-                ["balance:sum"],
-                ["date:month"]
-            )
-            revenue_data.extend(data)
-
-        # Fetch COGS from multiple account patterns
-        cogs_data = []
-        for pattern in cogs_patterns:
-            cogs_domain = base_domain + [["account_id.code", "=like", f"{pattern}%"]]
-            data = odoo_read_group(
-                "account.move.line",
-                cogs_domain,
-                ["balance:sum"],
-                ["date:month"]
-            )
-            cogs_data.extend(data)
-
-        # Fetch operating expenses per category
-        expenses_by_category = {}
-        for cat_code in expense_categories.keys():
-            exp_domain = base_domain + [["account_id.code", "=like", f"{cat_code}%"]]
-            exp_data = odoo_read_group(
-                "account.move.line",
-                exp_domain,
-                ["balance:sum"],
-                ["date:month"]
-            )
-            expenses_by_category[cat_code] = exp_data
+        # Fetch revenue, COGS and operating expenses per category
+        revenue_data = _read_group_monthly_for_patterns(base_domain, revenue_patterns)
+        cogs_data = _read_group_monthly_for_patterns(base_domain, cogs_patterns)
+        expenses_by_category = {
+            cat_code: _read_group_monthly_for_patterns(base_domain, [cat_code])
+            for cat_code in expense_categories.keys()
+        }
 
         # Calculate totals and averages
         # Revenue: typically negative in Odoo (credit), so we flip the sign
@@ -5485,6 +5621,8 @@ def get_base_year_data(company_id, base_year, revenue_patterns=None, cogs_patter
             "months_with_data": months_with_data,
             "cogs_percentage": (total_cogs / total_revenue) if total_revenue > 0 else 0.6
         }
+    except requests.exceptions.RequestException:
+        raise
     except Exception as e:
         # Note: st.error() cannot be used inside cached functions
         # Error will be handled by caller showing "Geen data gevonden"
@@ -5765,6 +5903,8 @@ def main():
             st.caption(f"Update: {datetime.now().strftime('%H:%M')}")
             if st.button("Ververs", key="refresh_btn"):
                 st.cache_data.clear()
+                clear_read_group_disk_cache()
+                _account_code_cache.clear()
                 st.rerun()
 
     if "exclude_intercompany" not in st.session_state:
@@ -5857,69 +5997,19 @@ def main():
         chart_title = "📈 Omzet vs Kosten per maand" + (" (excl. IC)" if exclude_intercompany else "")
         st.subheader(chart_title)
         
-        # Helper functie om maandnaam naar sorteerbare datum te converteren
-        def parse_month_key(month_str):
-            """Converteer 'January 2025' naar '2025-01' voor sortering"""
-            month_map = {
-                'January': '01', 'February': '02', 'March': '03', 'April': '04',
-                'May': '05', 'June': '06', 'July': '07', 'August': '08',
-                'September': '09', 'October': '10', 'November': '11', 'December': '12',
-                # Nederlandse maanden
-                'januari': '01', 'februari': '02', 'maart': '03', 'april': '04',
-                'mei': '05', 'juni': '06', 'juli': '07', 'augustus': '08',
-                'september': '09', 'oktober': '10', 'november': '11', 'december': '12'
-            }
-            try:
-                parts = month_str.split()
-                if len(parts) == 2:
-                    month_name, year = parts
-                    month_num = month_map.get(month_name, '00')
-                    return f"{year}-{month_num}"
-                return month_str
-            except:
-                return month_str
-        
         # Bouw monthly data van geaggregeerde resultaten
         if revenue_agg:
-            monthly = {}
-            
-            # Omzet per maand
-            for r in revenue_agg:
-                month_raw = r.get("date:month", "Unknown")
-                month = parse_month_key(month_raw)
-                if month not in monthly:
-                    monthly[month] = {"omzet": 0, "kosten": 0}
-                monthly[month]["omzet"] += -r.get("balance", 0)
-            
-            # Kosten per maand
-            for c in cost_agg:
-                month_raw = c.get("date:month", "Unknown")
-                month = parse_month_key(month_raw)
-                if month not in monthly:
-                    monthly[month] = {"omzet": 0, "kosten": 0}
-                monthly[month]["kosten"] += c.get("balance", 0)
+            df_monthly = pd.concat({
+                "Omzet": -monthly_balance_by_key(revenue_agg),
+                "Kosten": monthly_balance_by_key(cost_agg),
+            }, axis=1).fillna(0.0)
             
-            # Als IC filter aan: trek IC bedragen af per maand
+            # Als IC filter aan: trek de (hierboven al opgehaalde) IC bedragen af per maand
             if exclude_intercompany:
-                ic_revenue = get_intercompany_revenue(selected_year, company_id)
-                ic_costs = get_intercompany_costs(selected_year, company_id)
-                
-                for r in ic_revenue:
-                    month_raw = r.get("date:month", "Unknown")
-                    month = parse_month_key(month_raw)
-                    if month in monthly:
-                        monthly[month]["omzet"] -= -r.get("balance", 0)
-                
-                for c in ic_costs:
-                    month_raw = c.get("date:month", "Unknown")
-                    month = parse_month_key(month_raw)
-                    if month in monthly:
-                        monthly[month]["kosten"] -= c.get("balance", 0)
+                df_monthly["Omzet"] += monthly_balance_by_key(ic_revenue).reindex(df_monthly.index, fill_value=0.0)
+                df_monthly["Kosten"] -= monthly_balance_by_key(ic_costs).reindex(df_monthly.index, fill_value=0.0)
             
-            df_monthly = pd.DataFrame([
-                {"Maand": k, "Omzet": v["omzet"], "Kosten": v["kosten"]}
-                for k, v in sorted(monthly.items())
-            ])
+            df_monthly = df_monthly.sort_index().rename_axis("Maand").reset_index()
             
             if not df_monthly.empty:
                 fig = go.Figure()
@@ -6216,10 +6306,18 @@ def main():
         bank_data = get_bank_balances()
         rc_data = get_rc_balances()
         
+        # Eén keer indexeren per bedrijf i.p.v. per bedrijf opnieuw filteren
+        bank_by_company = defaultdict(list)
+        for b in bank_data:
+            bank_by_company[b.get("company_id", [None])[0]].append(b)
+        rc_by_company = defaultdict(list)
+        for r in rc_data:
+            rc_by_company[r.get("company_id", [None])[0]].append(r)
+        
         # Filter op geselecteerde entiteit
         if selected_entity != "Alle bedrijven":
-            bank_data_filtered = [b for b in bank_data if b.get("company_id", [None])[0] == company_id]
-            rc_data_filtered = [r for r in rc_data if r.get("company_id", [None])[0] == company_id] if rc_data else []
+            bank_data_filtered = bank_by_company[company_id]
+            rc_data_filtered = rc_by_company[company_id]
             companies_to_show = {company_id: COMPANIES[company_id]}
         else:
             bank_data_filtered = bank_data
@@ -6236,7 +6334,7 @@ def main():
             st.markdown("---")
             
             for comp_id, comp_name in companies_to_show.items():
-                comp_banks = [b for b in bank_data_filtered if b.get("company_id", [None])[0] == comp_id]
+                comp_banks = bank_by_company[comp_id]
                 if comp_banks:
                     comp_total = sum(b.get("current_statement_balance", 0) for b in comp_banks)
                     with st.expander(f"🏢 {comp_name} — €{comp_total:,.0f}", expanded=True):
@@ -6253,7 +6351,7 @@ def main():
                        "Rekeningen in de **12xxx** reeks zijn vorderingen, **14xxx** zijn schulden.")
                 
                 for comp_id, comp_name in companies_to_show.items():
-                    comp_rc = [r for r in rc_data_filtered if r.get("company_id", [None])[0] == comp_id]
+                    comp_rc = rc_by_company[comp_id]
                     if comp_rc:
                         comp_total = sum(r.get("current_statement_balance", 0) for r in comp_rc)
                         label = "Netto vordering" if comp_total >= 0 else "Netto schuld"
@@ -6273,8 +6371,7 @@ def main():
                 
                 comp_totals = []
                 for comp_id, comp_name in COMPANIES.items():
-                    comp_total = sum(b.get("current_statement_balance", 0) for b in bank_data 
-                                   if b.get("company_id", [None])[0] == comp_id)
+                    comp_total = sum(b.get("current_statement_balance", 0) for b in bank_by_company[comp_id])
                     if comp_total > 0:
                         comp_totals.append({"Entiteit": comp_name, "Saldo": comp_total})
                 
@@ -6867,37 +6964,31 @@ def main():
             if customers:
                 st.write(f"📍 {len(customers)} klanten gevonden")
                 
-                # Voeg coördinaten toe
-                map_data = []
-                missing_coords = 0
+                # Voeg coördinaten toe (één vectorized lookup voor alle klanten)
+                df_customers = pd.DataFrame(customers)
+                lat, lon = get_coords_batch(df_customers["zip"])
+                has_coords = ~np.isnan(lat)
+                missing_coords = int((~has_coords).sum())
                 
-                for c in customers:
-                    lat, lon = get_coords_from_postcode(c.get("zip"))
-                    if lat and lon:
-                        # Voeg kleine random offset toe om overlapping te voorkomen
-                        import random
-                        lat += random.uniform(-0.02, 0.02)
-                        lon += random.uniform(-0.02, 0.02)
-                        
-                        map_data.append({
-                            "Klant": c["name"],
-                            "Stad": c.get("city", ""),
-                            "Postcode": c.get("zip", ""),
-                            "Omzet": c["omzet"],
-                            "Facturen": c["facturen"],
-                            "lat": lat,
-                            "lon": lon,
-                            "size": max(10, min(50, c["omzet"] / 1000))  # Grootte schalen
-                        })
-                    else:
-                        missing_coords += 1
+                df_located = df_customers[has_coords]
+                n_located = len(df_located)
+                omzet = df_located["omzet"].to_numpy(dtype=float)
+                # Voeg kleine random offset toe om overlapping te voorkomen
+                df_map = pd.DataFrame({
+                    "Klant": df_located["name"].to_numpy(),
+                    "Stad": df_located["city"].to_numpy(),
+                    "Postcode": df_located["zip"].to_numpy(),
+                    "Omzet": omzet,
+                    "Facturen": df_located["facturen"].to_numpy(),
+                    "lat": lat[has_coords] + np.random.uniform(-0.02, 0.02, n_located),
+                    "lon": lon[has_coords] + np.random.uniform(-0.02, 0.02, n_located),
+                    "size": np.clip(omzet / 1000, 10, 50)  # Grootte schalen
+                })
                 
                 if missing_coords > 0:
                     st.info(f"ℹ️ {missing_coords} klanten zonder herkenbare postcode (niet op kaart)")
                 
-                if map_data:
-                    df_map = pd.DataFrame(map_data)
-                    
+                if not df_map.empty:
                     # Kaart maken met Plotly
                     fig = px.scatter_mapbox(
                         df_map,
@@ -6967,7 +7058,7 @@ def main():
         # Filter intercompany indien geselecteerd
         if exclude_intercompany and cost_data:
             cost_data = [c for c in cost_data 
-                        if not (c.get("partner_id") and c["partner_id"][0] in INTERCOMPANY_PARTNERS)]
+                        if not (c.get("partner_id") and c["partner_id"][0] in INTERCOMPANY_PARTNER_SET)]
         
         if cost_data:
             # Groepeer per account
@@ -7087,19 +7178,28 @@ def main():
         st.caption("Workflow: 1) mapping afronden 2) budgetimport vrijgeven 3) variantie analyseren.")
         st.markdown("---")
 
-        tab_map, tab_budget, tab_variance, tab_balance_map, tab_balance_report = st.tabs([
+        # Radio i.p.v. st.tabs: alleen het actieve onderdeel wordt uitgevoerd
+        # (st.tabs draait alle tabbladen, incl. de Odoo-zware variantie/balans).
+        report_views = [
             "🧭 Rekeningmapping W&V",
             "📥 Budget import",
             "📊 Variantie per maand",
             "🏛️ Balansmapping",
             "⚖️ Balansrapport (Activa/Passiva)"
-        ])
+        ]
+        report_view = st.radio(
+            "Onderdeel",
+            report_views,
+            horizontal=True,
+            key="report_view",
+            label_visibility="collapsed"
+        )
 
-        with tab_map:
+        if report_view == report_views[0]:
             st.caption("Map rekeningen 1-op-1 naar rapportregels op geaggregeerd niveau.")
             render_draggable_mapping_tool(report_company_id, selected_year)
 
-        with tab_budget:
+        elif report_view == report_views[1]:
             if not budget_released:
                 st.warning("Budgetimport is vergrendeld. Rond eerst mapping af en geef import vrij via de workflow-balk bovenaan.")
                 st.caption(f"Huidige mappingdekking: {mapping_status['coverage_pct']:.0f}% (drempel 60%)")
@@ -7123,7 +7223,7 @@ def main():
             else:
                 render_budget_import_tab(selected_year, default_company_id=report_company_id)
 
-        with tab_variance:
+        elif report_view == report_views[2]:
             if not budget_released:
                 st.info("Variantie kan al bekeken worden, maar budgetimport is nog vergrendeld.")
             render_variance_analysis_tab(
@@ -7132,10 +7232,10 @@ def main():
                 exclude_intercompany=report_exclude_ic
             )
 
-        with tab_balance_map:
+        elif report_view == report_views[3]:
             render_balance_mapping_tool(report_company_id, selected_year)
 
-        with tab_balance_report:
+        elif report_view == report_views[4]:
             balance_date_struct = st.date_input(
                 "Peildatum balansrapport",
                 value=datetime.now().date(),
@@ -7412,13 +7512,9 @@ def main():
             # Clear chat knop
             col1, col2, col3 = st.columns([1, 1, 3])
             with col1:
-                if st.button("🗑️ Wis chat"):
-                    st.session_state.chat_messages = []
-                    st.rerun()
+                st.button("🗑️ Wis chat", on_click=_clear_chat)
             with col2:
-                if st.button("💡 Voorbeelden"):
-                    st.session_state.show_examples = not st.session_state.get("show_examples", False)
-                    st.rerun()
+                st.button("💡 Voorbeelden", on_click=_toggle_chat_examples)
             
             # Toon voorbeeldvragen
             if st.session_state.get("show_examples", False):
@@ -7434,10 +7530,8 @@ def main():
                     "Wat is het banksaldo op dit moment?",
                     "Toon alle facturen boven €10.000"
                 ]
-                for ex in examples:
-                    if st.button(f"💬 {ex}", key=f"ex_{ex[:20]}"):
-                        st.session_state.chat_messages.append({"role": "user", "content": ex})
-                        st.rerun()
+                for ex_idx, ex in enumerate(examples):
+                    st.button(f"💬 {ex}", key=f"ex_{ex_idx}", on_click=_queue_chat_example, args=(ex,))
 
     # =========================================================================
     # PAGINA: LAB PROJECTS
@@ -8001,4 +8095,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except requests.exceptions.RequestException as e:
+        # Odoo onbereikbaar: melding tonen; er is niets leegs in st.cache_data opgeslagen
+        st.error(odoo_error_message(e))